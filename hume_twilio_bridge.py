@@ -4,19 +4,30 @@ Hume EVI + Twilio Media Streams Bridge
 Bridges Twilio Media Streams (WebSocket) to Hume EVI (WebSocket) for
 real-time voice conversations with backchanneling.
 
-Audio Flow:
+Audio Flow (HUME_AUDIO_ENCODING=mulaw, default):
 1. Twilio sends mulaw 8kHz audio via Media Streams
-2. Bridge converts to PCM 48kHz for Hume (EVI requires 48kHz)
+2. Bridge coalesces HUME_FRAME_BATCH frames (default 4) into one base64
+   message for Hume; with HUME_FRAME_BATCH=1 payloads are forwarded unchanged
+3. Hume processes and returns mulaw 8kHz audio
+4. Bridge forwards it back to Twilio unchanged
+
+Audio Flow (HUME_AUDIO_ENCODING=linear16):
+1. Twilio sends mulaw 8kHz audio via Media Streams
+2. Bridge converts to PCM 48kHz for Hume
 3. Hume processes and returns PCM 48kHz audio
 4. Bridge converts back to mulaw 8kHz for Twilio
 """
 
 import os
-import json
-import base64
+import socket
 import asyncio
 import logging
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Optional, Tuple
+import numpy as np
+import orjson
+import pybase64
 import websockets
 from fastapi import FastAPI, WebSocket, Request
 from fastapi.responses import Response
@@ -24,7 +35,24 @@ from fastapi.responses import Response
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Hume-Twilio Voice Bridge")
+
+# Worker threads for converting large linear16 chunks, kept separate from the
+# loop's default executor (which also serves DNS lookups)
+DSP_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global DSP_EXECUTOR
+    DSP_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="dsp")
+    try:
+        yield
+    finally:
+        DSP_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        DSP_EXECUTOR = None
+
+
+app = FastAPI(title="Hume-Twilio Voice Bridge", lifespan=lifespan)
 
 # Hume credentials from environment (with fallback for initial testing)
 HUME_API_KEY = os.environ.get("HUME_API_KEY", "xR0HqXgU7ImPkTLfmCCtrLOoetSAfGWAm12RkIS4tcy9Kphk")
@@ -34,21 +62,274 @@ HUME_CONFIG_ID = os.environ.get("HUME_CONFIG_ID", "7d7e9c68-a45f-47d5-9c21-a5847
 # Hume EVI WebSocket URL
 HUME_WS_URL = "wss://api.hume.ai/v0/evi/chat"
 
+# Audio format negotiated with Hume. "mulaw" lets the bridge pass Twilio's
+# payloads straight through; "linear16" converts to 48kHz PCM on the bridge.
+HUME_AUDIO_ENCODING = os.environ.get("HUME_AUDIO_ENCODING", "mulaw").strip().lower()
+if HUME_AUDIO_ENCODING not in ("mulaw", "linear16"):
+    raise ValueError(f"HUME_AUDIO_ENCODING must be 'mulaw' or 'linear16', got {HUME_AUDIO_ENCODING!r}")
+HUME_SAMPLE_RATE = 8000 if HUME_AUDIO_ENCODING == "mulaw" else 48000
+SESSION_SETTINGS_BYTES = orjson.dumps({
+    "type": "session_settings",
+    "audio": {
+        "encoding": HUME_AUDIO_ENCODING,
+        "sample_rate": HUME_SAMPLE_RATE,
+        "channels": 1
+    }
+})
+
+# Number of 20ms Twilio frames coalesced into one Hume audio_input message.
+# A partial batch is flushed if the rest doesn't arrive within the batch window,
+# so batching adds up to HUME_FRAME_BATCH * 20ms (80ms by default) of input
+# latency. Batches are decoded and re-encoded; only HUME_FRAME_BATCH=1
+# forwards Twilio's payloads untouched.
+HUME_FRAME_BATCH = max(1, int(os.environ.get("HUME_FRAME_BATCH", "4")))
+HUME_FRAME_BATCH_TIMEOUT = HUME_FRAME_BATCH * 0.02
+
+# Twilio sends media every 20ms; end the call if it goes quiet for this long.
+TWILIO_IDLE_TIMEOUT = 30
+WATCHDOG_INTERVAL = 5
+
+# Audio envelopes have a fixed shape and base64 never needs JSON escaping,
+# so they are built by concatenation instead of going through an encoder.
+AUDIO_INPUT_PREFIX = b'{"type":"audio_input","data":"'
+AUDIO_INPUT_SUFFIX = b'"}'
+TWILIO_MEDIA_SUFFIX = '"}}'
+
+# Markers for recognising audio frames without a full JSON parse. Both
+# services put the type discriminator first, so only the head is searched.
+TWILIO_EVENT_KEY = '"event":"'
+TWILIO_PAYLOAD_KEY = '"payload":"'
+HUME_AUDIO_OUTPUT_TYPE = b'"type":"audio_output"'
+HUME_DATA_KEY = b'"data":"'
+FRAME_HEAD_SIZE = 64
+
+# Twilio event codes returned by parse_twilio_frame(). OTHER is a recognised
+# event the bridge doesn't use (connected, mark, dtmf); UNKNOWN means the
+# frame needs a full JSON parse.
+TWILIO_EVENT_START = 0
+TWILIO_EVENT_MEDIA = 1
+TWILIO_EVENT_STOP = 2
+TWILIO_EVENT_OTHER = 3
+TWILIO_EVENT_UNKNOWN = 4
+TWILIO_EVENT_CODES = {
+    "start": TWILIO_EVENT_START,
+    "media": TWILIO_EVENT_MEDIA,
+    "stop": TWILIO_EVENT_STOP,
+    "connected": TWILIO_EVENT_OTHER,
+    "mark": TWILIO_EVENT_OTHER,
+    "dtmf": TWILIO_EVENT_OTHER,
+}
+
+# Kernel socket buffer size for the Hume connection
+SOCKET_BUFFER_SIZE = 64 * 1024
+
+
+# mu-law is an 8-bit codec, so both directions are a single table lookup.
+# The tables follow G.711 exactly as audioop implemented it (audioop is
+# deprecated and removed in Python 3.13).
+ULAW_BIAS = 0x84
+ULAW_CLIP = 8159
+ULAW_SEG_END = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+
+
+def ulaw_decode_table() -> np.ndarray:
+    """Build the 256-entry mu-law -> 16-bit PCM table."""
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    t = (((u & 0x0F) << 3) + ULAW_BIAS) << ((u & 0x70) >> 4)
+    return np.where(u & 0x80, ULAW_BIAS - t, t - ULAW_BIAS).astype(np.int16)
+
+
+def ulaw_encode_table() -> np.ndarray:
+    """Build the 65536-entry 16-bit PCM (indexed as uint16) -> mu-law table."""
+    pcm = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    mag = np.minimum(np.abs(pcm), ULAW_CLIP) + (ULAW_BIAS >> 2)
+    seg = np.searchsorted(ULAW_SEG_END, mag)
+    uval = np.where(seg >= 8, 0x7F, (seg << 4) | ((mag >> (seg + 1)) & 0x0F))
+    return (uval ^ mask).astype(np.uint8)
+
+
+ULAW2PCM = ulaw_decode_table()
+PCM2ULAW = ulaw_encode_table()
+
+
+def ulaw_to_pcm_into(ulaw_data, out: np.ndarray) -> np.ndarray:
+    """Decode mu-law from any bytes-like object into a preallocated int16 buffer.
+
+    Returns the filled slice of `out`. Nothing is copied on the way in, and the
+    lookup itself runs without the GIL.
+    """
+    src = np.frombuffer(ulaw_data, np.uint8)
+    dst = out[:len(src)]
+    np.take(ULAW2PCM, src, out=dst, mode="clip")
+    return dst
+
+
+def pcm_to_ulaw_into(pcm: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Encode int16 samples into a preallocated uint8 buffer; returns the filled slice."""
+    dst = out[:len(pcm)]
+    np.take(PCM2ULAW, pcm.view(np.uint16), out=dst, mode="clip")
+    return dst
+
+
+def parse_twilio_frame(data: str) -> Tuple[int, Optional[str]]:
+    """Identify a raw Twilio frame in one pass, without a full JSON parse.
+    
+    Returns (event code, payload). The payload is only extracted for media
+    frames, and is None when it would need unescaping.
+    """
+    start = data.find(TWILIO_EVENT_KEY, 0, FRAME_HEAD_SIZE)
+    if start < 0:
+        return TWILIO_EVENT_UNKNOWN, None
+    start += len(TWILIO_EVENT_KEY)
+    code = TWILIO_EVENT_CODES.get(data[start:data.find('"', start)], TWILIO_EVENT_UNKNOWN)
+    if code != TWILIO_EVENT_MEDIA:
+        return code, None
+    
+    payload = data.partition(TWILIO_PAYLOAD_KEY)[2].partition('"')[0]
+    if not payload or "\\" in payload:
+        return code, None
+    return code, payload
+
+
+def tune_socket(sock: Optional[socket.socket]) -> None:
+    """Configure a TCP socket to send small real-time audio frames immediately."""
+    if sock is None:
+        return
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+
+
+# Resampling between Twilio (8kHz) and Hume (48kHz) is a fixed 1:6 ratio, so it
+# is done with a polyphase FIR: only the non-zero input samples are multiplied
+# on the way up, and only the kept output samples are computed on the way down.
+# Filter history is carried between chunks to avoid clicks at chunk boundaries.
+RESAMPLE_FACTOR = 6
+FIR_NUM_TAPS = 48
+
+# Hume audio_output chunks of at least this many 48kHz samples are converted
+# in a worker thread; below it the thread hand-off costs more than the
+# conversion itself. Twilio batches are far smaller and always stay inline.
+DSP_THREAD_MIN_SAMPLES = int(os.environ.get("DSP_THREAD_MIN_SAMPLES", "8192"))
+# A Hume frame is almost entirely base64 PCM16: 4 chars -> 3 bytes -> 1.5 samples
+HUME_FRAME_THREAD_MIN_BYTES = DSP_THREAD_MIN_SAMPLES * 8 // 3
+
+# Initial per-bridge scratch buffer size, in 8kHz samples. Buffers only grow
+# (and then stay grown) if a chunk is larger than this.
+SCRATCH_SAMPLES = 8192
+
+
+def design_lowpass(num_taps: int, cutoff: float, beta: float = 8.0) -> np.ndarray:
+    """Design a Kaiser-windowed sinc lowpass (cutoff as a fraction of the sample rate)."""
+    n = np.arange(num_taps) - (num_taps - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(num_taps, beta)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+FIR_TAPS = design_lowpass(FIR_NUM_TAPS, 4000 / 48000)
+# Row p holds the sub-filter producing output phase p, reversed so it can be
+# applied directly to a sliding window of input samples (oldest first).
+UP_PHASES = np.ascontiguousarray(
+    (FIR_TAPS * RESAMPLE_FACTOR).reshape(-1, RESAMPLE_FACTOR).T[:, ::-1]
+)
+UP_HISTORY = UP_PHASES.shape[1] - 1
+DOWN_TAPS = np.ascontiguousarray(FIR_TAPS[::-1])
+DOWN_HISTORY = FIR_NUM_TAPS - 1
+
+
+def ensure_capacity(buf: np.ndarray, size: int) -> np.ndarray:
+    """Return `buf` if it holds at least `size` items, otherwise a larger empty buffer."""
+    if len(buf) >= size:
+        return buf
+    return np.empty(max(size, 2 * len(buf)), buf.dtype)
 
-def ulaw_to_pcm(ulaw_data: bytes) -> bytes:
-    """Convert mu-law to 16-bit PCM."""
-    import audioop
-    return audioop.ulaw2lin(ulaw_data, 2)
 
+def to_int16_into(samples: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Round and saturate float samples (in place) into a 16-bit PCM buffer."""
+    np.rint(samples, out=samples)
+    np.clip(samples, -32768, 32767, out=samples)
+    np.copyto(out, samples, casting="unsafe")
+    return out
 
-def pcm_to_ulaw(pcm_data: bytes) -> bytes:
-    """Convert 16-bit PCM to mu-law."""
-    import audioop
-    return audioop.lin2ulaw(pcm_data, 2)
 
+class Upsampler:
+    """Stateful 8kHz -> 48kHz resampler working in preallocated buffers.
+    
+    The array returned by process() is reused, so it is only valid until the
+    next call.
+    """
+    
+    def __init__(self, capacity: int = SCRATCH_SAMPLES):
+        # The first UP_HISTORY samples of the work buffer are the filter history
+        self._work = np.zeros(UP_HISTORY + capacity, np.float32)
+        self._acc = np.empty((capacity, RESAMPLE_FACTOR), np.float32)
+        self._out = np.empty(capacity * RESAMPLE_FACTOR, np.int16)
+    
+    def _reserve(self, n: int):
+        if UP_HISTORY + n <= len(self._work):
+            return
+        work = np.zeros(UP_HISTORY + n, np.float32)
+        work[:UP_HISTORY] = self._work[:UP_HISTORY]
+        self._work = work
+        self._acc = np.empty((n, RESAMPLE_FACTOR), np.float32)
+        self._out = np.empty(n * RESAMPLE_FACTOR, np.int16)
+    
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        n = len(samples)
+        if n == 0:
+            return self._out[:0]
+        self._reserve(n)
+        x = self._work[:UP_HISTORY + n]
+        x[UP_HISTORY:] = samples
+        windows = np.lib.stride_tricks.sliding_window_view(x, UP_HISTORY + 1)
+        acc = self._acc[:n]
+        np.matmul(windows, UP_PHASES.T, out=acc)
+        out = to_int16_into(acc.reshape(-1), self._out[:n * RESAMPLE_FACTOR])
+        x[:UP_HISTORY] = x[n:]
+        return out
 
-# Note: Resampling is now done via instance methods to maintain state between chunks
-# This eliminates clicking/popping at chunk boundaries
+
+class Downsampler:
+    """Stateful 48kHz -> 8kHz resampler working in preallocated buffers.
+    
+    Besides the filter history, input left over when a chunk is not a multiple
+    of the decimation factor is carried into the next call, so the output phase
+    stays aligned. The array returned by process() is only valid until the next
+    call.
+    """
+    
+    def __init__(self, capacity: int = SCRATCH_SAMPLES):
+        self._work = np.zeros(DOWN_HISTORY + RESAMPLE_FACTOR * capacity, np.float32)
+        self._held = DOWN_HISTORY
+        self._acc = np.empty(capacity, np.float32)
+        self._out = np.empty(capacity, np.int16)
+    
+    def _reserve(self, total: int, count: int):
+        if total > len(self._work):
+            work = np.empty(total, np.float32)
+            work[:self._held] = self._work[:self._held]
+            self._work = work
+        if count > len(self._acc):
+            self._acc = np.empty(count, np.float32)
+            self._out = np.empty(count, np.int16)
+    
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        total = self._held + len(samples)
+        count = max(0, (total - FIR_NUM_TAPS) // RESAMPLE_FACTOR + 1)
+        self._reserve(total, count)
+        x = self._work[:total]
+        x[self._held:] = samples
+        out = self._out[:count]
+        if count:
+            windows = np.lib.stride_tricks.sliding_window_view(x, FIR_NUM_TAPS)[::RESAMPLE_FACTOR]
+            acc = self._acc[:count]
+            np.matmul(windows, DOWN_TAPS, out=acc)
+            to_int16_into(acc, out)
+        consumed = count * RESAMPLE_FACTOR
+        self._held = total - consumed
+        x[:self._held] = x[consumed:]
+        return out
 
 
 class HumeTwilioBridge:
@@ -57,46 +338,20 @@ class HumeTwilioBridge:
     def __init__(self, twilio_ws: WebSocket, config_id: str):
         self.twilio_ws = twilio_ws
         self.config_id = config_id
-        self.hume_ws: Optional[websockets.WebSocketClientProtocol] = None
+        self.hume_ws: Optional[websockets.ClientConnection] = None
         self.stream_sid: Optional[str] = None
         self.call_sid: Optional[str] = None
+        self._twilio_prefix: Optional[str] = None
         self._running = False
-    
-    def resample_up(self, data: bytes) -> bytes:
-        """Resample from 8kHz to 48kHz (6x) using linear interpolation."""
-        import array
-        samples = array.array('h')
-        samples.frombytes(data)
-        
-        if len(samples) == 0:
-            return b''
-        
-        # 6x upsampling with linear interpolation
-        upsampled = array.array('h')
-        for i in range(len(samples) - 1):
-            s1, s2 = samples[i], samples[i + 1]
-            for j in range(6):
-                # Linear interpolation between s1 and s2
-                val = s1 + (s2 - s1) * j // 6
-                upsampled.append(val)
-        # Last sample repeated
-        for _ in range(6):
-            upsampled.append(samples[-1])
-        
-        return upsampled.tobytes()
-    
-    def resample_down(self, data: bytes) -> bytes:
-        """Resample from 48kHz to 8kHz (6x) by decimation."""
-        import array
-        samples = array.array('h')
-        samples.frombytes(data)
-        
-        # Take every 6th sample
-        downsampled = array.array('h')
-        for i in range(0, len(samples), 6):
-            downsampled.append(samples[i])
-        
-        return downsampled.tobytes()
+        self._last_rx = 0.0
+        self._batch = bytearray()
+        self._batch_count = 0
+        self._batch_flush: Optional[asyncio.Task] = None
+        # Per-bridge DSP buffers for the linear16 path, reused for every chunk
+        self._upsampler = Upsampler()
+        self._downsampler = Downsampler()
+        self._pcm_in = np.empty(SCRATCH_SAMPLES, np.int16)
+        self._ulaw_out = np.empty(SCRATCH_SAMPLES, np.uint8)
         
     async def connect_hume(self) -> bool:
         """Connect to Hume EVI WebSocket."""
@@ -109,27 +364,38 @@ class HumeTwilioBridge:
                 additional_headers=headers,
                 ping_interval=20,
                 ping_timeout=20,
+                open_timeout=10,
+                # base64 audio doesn't compress, and frames are trusted and small
+                compression=None,
+                max_size=None,
+                write_limit=2**20,
             )
-            logger.info(f"Connected to Hume EVI with config: {self.config_id}")
+            try:
+                tune_socket(self.hume_ws.transport.get_extra_info("socket"))
+            except OSError as e:
+                # Only a latency tweak; the connection works without it
+                logger.warning("Could not tune Hume socket: %s", e)
+            logger.info("Connected to Hume EVI with config: %s", self.config_id)
             
             # Send session settings to configure audio format
-            # Hume EVI requires 48kHz for best quality
-            session_settings = {
-                "type": "session_settings",
-                "audio": {
-                    "encoding": "linear16",
-                    "sample_rate": 48000,
-                    "channels": 1
-                }
-            }
-            await self.hume_ws.send(json.dumps(session_settings))
-            logger.info("Sent audio session settings to Hume (linear16, 48kHz)")
+            await self.hume_ws.send(SESSION_SETTINGS_BYTES, text=True)
+            logger.info("Sent audio session settings to Hume (%s, %dHz)", HUME_AUDIO_ENCODING, HUME_SAMPLE_RATE)
             
             return True
         except Exception as e:
-            logger.error(f"Failed to connect to Hume: {e}")
+            logger.error("Failed to connect to Hume: %s", e)
             return False
     
+    async def handle_twilio_frame(self, data: str):
+        """Dispatch a raw Twilio frame, skipping the JSON parse where possible."""
+        code, payload = parse_twilio_frame(data)
+        if payload is not None:
+            await self.handle_twilio_media(payload)
+        elif code != TWILIO_EVENT_OTHER:
+            # start/stop need their fields; anything unrecognised or escaped
+            # goes through the full parser
+            await self.handle_twilio_message(orjson.loads(data))
+    
     async def handle_twilio_message(self, message: dict):
         """Process incoming Twilio Media Stream message."""
         event = message.get("event")
@@ -137,93 +403,194 @@ class HumeTwilioBridge:
         if event == "start":
             self.stream_sid = message.get("streamSid")
             self.call_sid = message.get("start", {}).get("callSid")
-            logger.info(f"Call started: {self.call_sid}")
+            self._twilio_prefix = f'{{"event":"media","streamSid":"{self.stream_sid}","media":{{"payload":"'
+            logger.info("Call started: %s", self.call_sid)
             
         elif event == "media":
             payload = message.get("media", {}).get("payload")
-            if payload and self.hume_ws:
-                # Decode base64 mulaw, convert to PCM 48kHz for Hume EVI
-                mulaw_data = base64.b64decode(payload)
-                pcm_data = ulaw_to_pcm(mulaw_data)
-                pcm_data = self.resample_up(pcm_data)  # 8kHz -> 48kHz with state
-                
-                audio_message = {
-                    "type": "audio_input",
-                    "data": base64.b64encode(pcm_data).decode()
-                }
-                await self.hume_ws.send(json.dumps(audio_message))
+            if payload:
+                await self.handle_twilio_media(payload)
                 
         elif event == "stop":
-            logger.info(f"Call ended: {self.call_sid}")
+            logger.info("Call ended: %s", self.call_sid)
+            await self.flush_audio_batch()
             self._running = False
     
-    async def handle_hume_message(self, message: dict):
-        """Process incoming Hume EVI message."""
+    async def handle_twilio_media(self, payload: str):
+        """Forward a base64 mulaw payload from Twilio to Hume."""
+        if not self.hume_ws:
+            return
+        
+        if HUME_FRAME_BATCH == 1 and HUME_AUDIO_ENCODING == "mulaw":
+            # Hume takes Twilio's base64 mulaw as-is
+            await self.hume_ws.send(AUDIO_INPUT_PREFIX + payload.encode() + AUDIO_INPUT_SUFFIX, text=True)
+            return
+        
+        self._batch += pybase64.b64decode(payload)
+        self._batch_count += 1
+        if self._batch_count >= HUME_FRAME_BATCH:
+            await self.flush_audio_batch()
+        elif self._batch_flush is None:
+            self._batch_flush = asyncio.create_task(self._flush_audio_batch_later())
+    
+    async def flush_audio_batch(self):
+        """Send any batched Twilio audio to Hume."""
+        if self._batch_flush is not None:
+            self._batch_flush.cancel()
+            self._batch_flush = None
+        if not self._batch:
+            return
+        
+        # Encode straight from the batch buffer, then reuse it for the next batch
+        if HUME_AUDIO_ENCODING == "mulaw":
+            data = pybase64.b64encode(self._batch)
+        else:
+            data = self.encode_audio_input(self._batch)
+        self._batch.clear()
+        self._batch_count = 0
+        
+        await self.hume_ws.send(AUDIO_INPUT_PREFIX + data + AUDIO_INPUT_SUFFIX, text=True)
+    
+    def encode_audio_input(self, mulaw_data) -> bytes:
+        """Convert mulaw 8kHz to base64 PCM 48kHz for Hume EVI."""
+        self._pcm_in = ensure_capacity(self._pcm_in, len(mulaw_data))
+        pcm = ulaw_to_pcm_into(mulaw_data, self._pcm_in)
+        pcm = self._upsampler.process(pcm)  # 8kHz -> 48kHz with state
+        return pybase64.b64encode(pcm)
+    
+    async def _flush_audio_batch_later(self):
+        """Flush a partial batch once the batch window has passed."""
+        await asyncio.sleep(HUME_FRAME_BATCH_TIMEOUT)
+        # Detach first so flush_audio_batch doesn't cancel this task mid-send
+        self._batch_flush = None
+        try:
+            await self.flush_audio_batch()
+        except Exception as e:
+            logger.error("Error flushing audio to Hume: %s", e)
+    
+    def handle_hume_frame(self, data: bytes) -> Optional[str]:
+        """Dispatch a raw Hume frame, skipping the JSON parse for audio.
+        
+        Returns the Twilio message to send, if any.
+        """
+        if HUME_AUDIO_OUTPUT_TYPE in data[:FRAME_HEAD_SIZE]:
+            audio_b64 = data.partition(HUME_DATA_KEY)[2].partition(b'"')[0]
+            # Anything escaped or unexpected goes through the full parser
+            if audio_b64 and b"\\" not in audio_b64:
+                return self.handle_hume_audio(audio_b64.decode())
+        return self.handle_hume_message(orjson.loads(data))
+    
+    def handle_hume_message(self, message: dict) -> Optional[str]:
+        """Process incoming Hume EVI message. Returns the Twilio message to send, if any."""
         msg_type = message.get("type")
         
         if msg_type == "audio_output":
             audio_b64 = message.get("data")
             audio_id = message.get("id", "?")
             audio_index = message.get("index", 0)
-            if audio_b64 and self.stream_sid:
-                try:
-                    # Convert PCM 48kHz from Hume to mulaw 8kHz for Twilio
-                    pcm_data = base64.b64decode(audio_b64)
-                    logger.debug(f"Audio chunk {audio_id}[{audio_index}]: {len(pcm_data)} bytes")
-                    pcm_data = self.resample_down(pcm_data)  # 48kHz -> 8kHz with state
-                    mulaw_data = pcm_to_ulaw(pcm_data)
-                    
-                    twilio_message = {
-                        "event": "media",
-                        "streamSid": self.stream_sid,
-                        "media": {"payload": base64.b64encode(mulaw_data).decode()}
-                    }
-                    await self.twilio_ws.send_json(twilio_message)
-                except Exception as e:
-                    logger.error(f"Audio conversion error: {e}")
+            if audio_b64:
+                logger.debug("Audio chunk %s[%s]: %d base64 chars", audio_id, audio_index, len(audio_b64))
+                return self.handle_hume_audio(audio_b64)
                 
         elif msg_type == "user_message":
-            logger.info(f"User: {message.get('message', {}).get('content')}")
+            logger.info("User: %s", message.get("message", {}).get("content"))
         elif msg_type == "assistant_message":
-            logger.info(f"Sarah: {message.get('message', {}).get('content')}")
+            logger.info("Sarah: %s", message.get("message", {}).get("content"))
         elif msg_type == "user_interruption":
             logger.info("User interrupted")
         elif msg_type == "error":
-            logger.error(f"Hume error: {message.get('message')} - code: {message.get('code')}")
+            logger.error("Hume error: %s - code: %s", message.get("message"), message.get("code"))
         else:
-            logger.debug(f"Hume message type: {msg_type}")
+            logger.debug("Hume message type: %s", msg_type)
+        return None
+    
+    def handle_hume_audio(self, audio_b64: str) -> Optional[str]:
+        """Build the Twilio media message for base64 audio from Hume."""
+        if not self._twilio_prefix:
+            return None
+        try:
+            if HUME_AUDIO_ENCODING == "mulaw":
+                # Already mulaw 8kHz, forward unchanged
+                payload = audio_b64
+            else:
+                # Convert PCM 48kHz from Hume to mulaw 8kHz for Twilio
+                pcm = np.frombuffer(pybase64.b64decode(audio_b64), np.int16)
+                pcm = self._downsampler.process(pcm)  # 48kHz -> 8kHz with state
+                self._ulaw_out = ensure_capacity(self._ulaw_out, len(pcm))
+                mulaw = pcm_to_ulaw_into(pcm, self._ulaw_out)
+                payload = pybase64.b64encode_as_string(mulaw)
+        except Exception as e:
+            logger.error("Audio conversion error: %s", e)
+            return None
+        return self._twilio_prefix + payload + TWILIO_MEDIA_SUFFIX
     
     async def receive_hume_messages(self):
         """Listen for messages from Hume."""
+        loop = asyncio.get_running_loop()
         try:
-            async for message in self.hume_ws:
-                await self.handle_hume_message(json.loads(message))
+            while True:
+                # recv() returns without yielding while frames are already
+                # buffered, and handling is synchronous, so a burst is drained
+                # in one pass; only sends to Twilio go back to the event loop.
+                # Skip UTF-8 decoding; orjson parses the raw bytes directly.
+                message = await self.hume_ws.recv(decode=False)
+                if HUME_AUDIO_ENCODING != "mulaw" and len(message) >= HUME_FRAME_THREAD_MIN_BYTES:
+                    # Large chunks are resampled off the event loop; NumPy
+                    # releases the GIL, so other calls keep flowing meanwhile
+                    twilio_message = await loop.run_in_executor(DSP_EXECUTOR, self.handle_hume_frame, message)
+                else:
+                    twilio_message = self.handle_hume_frame(message)
+                if twilio_message is not None:
+                    try:
+                        await self.twilio_ws.send_text(twilio_message)
+                    except Exception as e:
+                        logger.error("Error sending audio to Twilio: %s", e)
         except websockets.exceptions.ConnectionClosed:
             logger.info("Hume connection closed")
         except Exception as e:
-            logger.error(f"Error receiving from Hume: {e}")
+            logger.error("Error receiving from Hume: %s", e)
+    
+    async def _watchdog(self):
+        """Close the call if no Twilio frames arrive within the idle timeout."""
+        loop = asyncio.get_running_loop()
+        while self._running:
+            await asyncio.sleep(WATCHDOG_INTERVAL)
+            if loop.time() - self._last_rx > TWILIO_IDLE_TIMEOUT:
+                logger.warning("No Twilio audio for %ss, closing call: %s", TWILIO_IDLE_TIMEOUT, self.call_sid)
+                self._running = False
+                try:
+                    await self.twilio_ws.close()
+                except Exception as e:
+                    logger.error("Error closing idle Twilio socket: %s", e)
     
     async def run(self):
         """Main bridge loop."""
         if not await self.connect_hume():
             return
             
+        loop = asyncio.get_running_loop()
         self._running = True
+        self._last_rx = loop.time()
         hume_task = asyncio.create_task(self.receive_hume_messages())
+        watchdog_task = asyncio.create_task(self._watchdog())
         
         try:
             await self.twilio_ws.accept()
             while self._running:
                 try:
-                    data = await asyncio.wait_for(self.twilio_ws.receive_text(), timeout=30)
-                    await self.handle_twilio_message(json.loads(data))
-                except asyncio.TimeoutError:
-                    continue
+                    data = await self.twilio_ws.receive_text()
+                    self._last_rx = loop.time()
+                    await self.handle_twilio_frame(data)
                 except Exception as e:
-                    logger.error(f"Error: {e}")
+                    # The watchdog closing the socket also lands here
+                    if self._running:
+                        logger.error("Error: %s", e)
                     break
         finally:
             hume_task.cancel()
+            watchdog_task.cancel()
+            if self._batch_flush is not None:
+                self._batch_flush.cancel()
             if self.hume_ws:
                 await self.hume_ws.close()
 
@@ -236,7 +603,6 @@ async def health():
 @app.get("/debug/hume-test")
 async def hume_test():
     """Test Hume EVI connection."""
-    import websockets
     try:
         headers = {"X-Hume-Api-Key": HUME_API_KEY}
         url = f"{HUME_WS_URL}?config_id={HUME_CONFIG_ID}"
@@ -275,4 +641,12 @@ async def voice_stream(websocket: WebSocket):
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8080))
-    uvicorn.run(app, host="0.0.0.0", port=port, log_level="info")
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+        log_level="info",
+    )
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from hume_twilio_bridge import (
+    FIR_TAPS,
+    RESAMPLE_FACTOR,
+    Downsampler,
+    Upsampler,
+)
+
+
+def reference_upsample(samples: np.ndarray) -> np.ndarray:
+    """Zero-stuff and filter in float64, the textbook way."""
+    stuffed = np.zeros(len(samples) * RESAMPLE_FACTOR)
+    stuffed[::RESAMPLE_FACTOR] = samples
+    out = np.convolve(stuffed, FIR_TAPS.astype(np.float64) * RESAMPLE_FACTOR)[:len(stuffed)]
+    return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+
+def reference_downsample(samples: np.ndarray) -> np.ndarray:
+    """Filter in float64 and keep every RESAMPLE_FACTOR-th output."""
+    out = np.convolve(samples.astype(np.float64), FIR_TAPS.astype(np.float64))[:len(samples)]
+    return np.clip(np.rint(out[::RESAMPLE_FACTOR]), -32768, 32767).astype(np.int16)
+
+
+def run_in_chunks(resampler, samples, sizes):
+    outs, i, k = [], 0, 0
+    while i < len(samples):
+        size = sizes[k % len(sizes)]
+        outs.append(resampler.process(samples[i:i + size]).copy())
+        i += size
+        k += 1
+    return np.concatenate(outs)
+
+
+@pytest.fixture
+def noise():
+    return np.random.default_rng(0).integers(-20000, 20000, 48000).astype(np.int16)
+
+
+# The resamplers work in float32 (and BLAS may sum in a different order per
+# chunk shape), so rounding may land one LSB away from the float64 reference.
+
+@pytest.mark.parametrize("sizes", [[160], [1, 0, 37, 500, 160]])
+def test_upsampler_matches_reference(noise, sizes):
+    samples = noise[:8000]
+    # Small capacity forces the buffers to grow part way through
+    out = run_in_chunks(Upsampler(capacity=100), samples, sizes)
+    np.testing.assert_allclose(out, reference_upsample(samples), rtol=0, atol=1)
+
+
+@pytest.mark.parametrize("sizes", [[960], [997, 0, 5, 3000, 1]])
+def test_downsampler_matches_reference(noise, sizes):
+    out = run_in_chunks(Downsampler(capacity=50), noise, sizes)
+    np.testing.assert_allclose(out, reference_downsample(noise), rtol=0, atol=1)
+
+
+def test_empty_chunks():
+    assert len(Upsampler().process(np.empty(0, np.int16))) == 0
+    assert len(Downsampler().process(np.empty(0, np.int16))) == 0
@@ -0,0 +1,33 @@
+import pytest
+
+from hume_twilio_bridge import (
+    TWILIO_EVENT_MEDIA,
+    TWILIO_EVENT_OTHER,
+    TWILIO_EVENT_START,
+    TWILIO_EVENT_STOP,
+    TWILIO_EVENT_UNKNOWN,
+    parse_twilio_frame,
+)
+
+
+@pytest.mark.parametrize("frame, expected", [
+    (
+        '{"event":"media","sequenceNumber":"3","media":{"track":"inbound","chunk":"1",'
+        '"timestamp":"5","payload":"f/7+/A=="},"streamSid":"MZ123"}',
+        (TWILIO_EVENT_MEDIA, "f/7+/A=="),
+    ),
+    ('{"event":"start","sequenceNumber":"1","start":{"callSid":"CA1"},"streamSid":"MZ123"}', (TWILIO_EVENT_START, None)),
+    ('{"event":"stop","sequenceNumber":"9","streamSid":"MZ123"}', (TWILIO_EVENT_STOP, None)),
+    ('{"event":"mark","sequenceNumber":"4","mark":{"name":"x"},"streamSid":"MZ123"}', (TWILIO_EVENT_OTHER, None)),
+    ('{"event":"connected","protocol":"Call","version":"1.0.0"}', (TWILIO_EVENT_OTHER, None)),
+    # Not in the compact form Twilio sends: left to the full JSON parser
+    ('{"event": "media", "media": {"payload": "f/7+/A=="}}', (TWILIO_EVENT_UNKNOWN, None)),
+    ('{"event":"something_new"}', (TWILIO_EVENT_UNKNOWN, None)),
+    # Event key outside the searched head
+    ('{"streamSid":"MZ18ad3ab5a668481ce02b83e7395059f0","sequenceNumber":"2","event":"media"}', (TWILIO_EVENT_UNKNOWN, None)),
+    # Escaped payloads need unescaping, so the payload isn't returned
+    ('{"event":"media","media":{"payload":"f\\/7+\\/A=="}}', (TWILIO_EVENT_MEDIA, None)),
+    ('{"event":"media","media":{}}', (TWILIO_EVENT_MEDIA, None)),
+])
+def test_parse_twilio_frame(frame, expected):
+    assert parse_twilio_frame(frame) == expected
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from hume_twilio_bridge import PCM2ULAW, ULAW2PCM, pcm_to_ulaw_into, ulaw_to_pcm_into
+
+
+def test_known_codes():
+    # G.711 mu-law: codes are stored inverted, 0xFF/0x7F are +/-0
+    assert ULAW2PCM[0xFF] == 0
+    assert ULAW2PCM[0x7F] == 0
+    assert ULAW2PCM[0x80] == 32124
+    assert ULAW2PCM[0x00] == -32124
+    assert PCM2ULAW[0] == 0xFF
+    assert PCM2ULAW[np.uint16(32767)] == 0x80
+    assert PCM2ULAW[np.int16(-32768).view(np.uint16)] == 0x00
+
+
+def test_encode_inverts_decode():
+    codes = np.arange(256, dtype=np.uint8)
+    codes = codes[codes != 0x7F]  # -0 encodes as +0
+    np.testing.assert_array_equal(PCM2ULAW[ULAW2PCM[codes].view(np.uint16)], codes)
+
+
+def test_tables_match_audioop():
+    audioop = pytest.importorskip("audioop")
+    decoded = np.frombuffer(audioop.ulaw2lin(bytes(range(256)), 2), np.int16)
+    np.testing.assert_array_equal(ULAW2PCM, decoded)
+    pcm = np.arange(65536, dtype=np.uint16).tobytes()
+    np.testing.assert_array_equal(PCM2ULAW, np.frombuffer(audioop.lin2ulaw(pcm, 2), np.uint8))
+
+
+def test_into_variants_fill_prefix():
+    ulaw = bytearray(range(200))
+    pcm = ulaw_to_pcm_into(ulaw, np.empty(256, np.int16))
+    np.testing.assert_array_equal(pcm, ULAW2PCM[:200])
+    out = pcm_to_ulaw_into(pcm, np.empty(256, np.uint8))
+    assert len(out) == 200
+    np.testing.assert_array_equal(out, PCM2ULAW[pcm.view(np.uint16)])